@@ -2,9 +2,18 @@
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import os
+import queue
+import threading
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
 from pathlib import Path
-from typing import Any, Literal, cast, Optional, Union, TypedDict
+from typing import Any, Callable, Literal, cast, Optional, Union, TypedDict
 
 import numpy as np
 
@@ -24,13 +33,349 @@ import gradio.image_utils as image_utils
 set_documentation_group("component")
 _Image.init()  # fixes https://github.com/gradio-app/gradio/issues/2843
 
+_EXIF_ORIENTATION = 0x0112
+
+# Downscales keep at least this ratio for the final resample after the integer box
+# reduce, as with Pillow's own `reducing_gap`.
+_REDUCING_GAP = 2.0
+
+# preprocess runs once per frame when streaming from the webcam, so its helpers are
+# bound here rather than looked up through their modules on every call
+_open = _Image.open
+_fromarray = _Image.fromarray
+_exif_transpose = PIL.ImageOps.exif_transpose
+_invert = PIL.ImageOps.invert
+_mirror = PIL.ImageOps.mirror
+_resize_and_crop = processing_utils.resize_and_crop
+_save_base64_to_cache = processing_utils.save_base64_to_cache
+_extract_base64_data = processing_utils.extract_base64_data
+
+# Recently encoded outputs, keyed by content digest. Kept small since every entry
+# holds a full base64 string.
+_ENCODE_CACHE_SIZE = 8
+_encode_cache: OrderedDict[tuple, str] = OrderedDict()
+_encode_cache_lock = threading.Lock()
+
+# PIL and zlib release the GIL while encoding, so encodes overlap across threads
+_encode_pool = ThreadPoolExecutor(
+    max_workers=os.cpu_count(), thread_name_prefix="legacyimage-encode"
+)
+
+
+def _digest(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _array_key(arr: np.ndarray) -> tuple:
+    return ("array", arr.dtype.str, arr.shape, _digest(arr))
+
+
+def _fast_tobytes(im: _Image.Image) -> bytes:
+    """
+    Same as `im.tobytes()`, but gives the raw encoder a buffer sized for the whole image
+    so it runs in one call instead of in 64 KiB chunks that are joined afterwards.
+    """
+    im.load()
+    if im.width == 0 or im.height == 0:
+        return b""
+    encoder = _Image._getencoder(im.mode, "raw", im.mode)
+    encoder.setimage(im.im)
+    _, errcode, data = encoder.encode(im.width * im.height * len(im.getbands()))
+    if errcode == 0:  # more than one byte per band, e.g. "I" or "F"
+        return im.tobytes()
+    if errcode < 0:
+        raise RuntimeError(f"encoder error {errcode} in tobytes")
+    return data
+
+
+def _info_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return _digest(value)
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return repr(value)
+
+
+def _pil_key(im: _Image.Image) -> tuple:
+    pixels = _digest(_fast_tobytes(im))
+    # the encoders also write the palette and read `info` (text chunks, transparency,
+    # icc_profile, dpi, ...), so all of it is part of the key
+    palette = (
+        (im.palette.mode, _digest(im.palette.tobytes()))
+        if im.palette is not None
+        else None
+    )
+    info = tuple(
+        sorted(
+            ((str(k), _info_value(v)) for k, v in im.info.items()),
+            key=lambda kv: kv[0],
+        )
+    )
+    return ("pil", im.mode, im.size, palette, info, pixels)
+
+
+def _path_key(path: str | Path) -> tuple | None:
+    path = str(path)
+    if client_utils.is_http_url_like(path):
+        return None  # remote content may change between calls
+    stat = os.stat(path)
+    return ("file", path, stat.st_mtime_ns, stat.st_size)
+
+
+# Output buffers are reused across encodes rather than allocated per frame. Buffers
+# are rewound but never truncated, so each one keeps its capacity between uses.
+_BUF_POOL_SIZE = 8
+_buf_pool: queue.LifoQueue[BytesIO] = queue.LifoQueue(maxsize=_BUF_POOL_SIZE)
+
+
+def _borrow_buf() -> BytesIO:
+    try:
+        return _buf_pool.get_nowait()
+    except queue.Empty:
+        return BytesIO()
+
+
+def _return_buf(buf: BytesIO) -> None:
+    buf.seek(0)
+    try:
+        _buf_pool.put_nowait(buf)
+    except queue.Full:
+        pass
+
+
+def _save_to_base64(im: _Image.Image, format: str, **params) -> str:
+    buf = _borrow_buf()
+    try:
+        im.save(buf, format, **params)
+        with buf.getbuffer() as view:
+            data = base64.b64encode(view[: buf.tell()])
+    finally:
+        _return_buf(buf)
+    return f"data:image/{format.lower()};base64," + str(data, "utf-8")
+
+
+def _array_to_base64(arr: np.ndarray, format: str) -> str:
+    if arr.dtype != np.uint8:
+        return processing_utils.encode_array_to_base64(arr)
+    if format == "jpeg" and (arr.ndim == 2 or (arr.ndim == 3 and arr.shape[2] == 3)):
+        return _save_to_base64(_fromarray(arr), "JPEG")
+    return _save_to_base64(_fromarray(arr), "PNG")
+
+
+def _pil_to_base64(im: _Image.Image, format: str) -> str:
+    if format == "jpeg" and im.mode in ("L", "RGB"):
+        return _save_to_base64(im, "JPEG")
+    return _save_to_base64(im, "PNG", pnginfo=processing_utils.get_pil_metadata(im))
+
+
+def _cached_encode(key: tuple | None, encode: Callable[[Any], str], value: Any) -> str:
+    """Encodes `value`, reusing the result of a recent call with the same `key`."""
+    if key is None:
+        return encode(value)
+    with _encode_cache_lock:
+        if key in _encode_cache:
+            _encode_cache.move_to_end(key)
+            return _encode_cache[key]
+    encoded = encode(value)
+    with _encode_cache_lock:
+        _encode_cache[key] = encoded
+        if len(_encode_cache) > _ENCODE_CACHE_SIZE:
+            _encode_cache.popitem(last=False)
+    return encoded
+
+
+def _encode_array(arr: np.ndarray, format: str) -> str:
+    # flipped or sliced views are made contiguous once so PIL can wrap the buffer
+    arr = np.ascontiguousarray(arr)
+    return _cached_encode(
+        _array_key(arr) + (format,), partial(_array_to_base64, format=format), arr
+    )
+
+
+def _encode_pil(im: _Image.Image, format: str) -> str:
+    return _cached_encode(
+        _pil_key(im) + (format,), partial(_pil_to_base64, format=format), im
+    )
+
+
+def _encode_path(path: str | Path, format: str) -> str:
+    return _cached_encode(
+        _path_key(path), client_utils.encode_url_or_file_to_base64, path
+    )
+
+
+# postprocess looks encoders up by the exact type of the value; subclasses (e.g.
+# PngImageFile, PosixPath) are resolved through the MRO once and then cached here
+_ENCODERS: dict[type, Callable[[Any, str], str]] = {
+    np.ndarray: _encode_array,
+    _Image.Image: _encode_pil,
+    str: _encode_path,
+    Path: _encode_path,
+}
+
+
+def _find_encoder(cls: type) -> Callable[[Any, str], str]:
+    for base in cls.__mro__[1:]:
+        if base in _ENCODERS:
+            _ENCODERS[cls] = _ENCODERS[base]
+            return _ENCODERS[cls]
+    raise ValueError("Cannot process this value as an Image")
+
+
 class PreprocessData(TypedDict):
     back: Optional[Union[np.ndarray, _Image.Image, str]]
     mask: Optional[Union[np.ndarray, _Image.Image, str]]
 
+def _passes_through(
+    shape: tuple[int, int] | None, invert_colors: bool, mirror: bool, type: str
+) -> bool:
+    """Whether a `filepath` component can hand out the upload as it is in the cache."""
+    return type == "filepath" and shape is None and not invert_colors and not mirror
+
+
+def _compile_process_image(
+    image_mode: str,
+    shape: tuple[int, int] | None,
+    invert_colors: bool,
+    mirror: bool,
+    type: str,
+    format_image: Callable[[_Image.Image], np.ndarray | _Image.Image | str | None],
+) -> Callable[[_Image.Image], np.ndarray | _Image.Image | str | None]:
+    """
+    Builds the function that applies the mode conversion, resize, invert and mirror
+    steps to an opened image and formats it according to `type`. The options are fixed
+    once a component is constructed, so only the steps they enable are chained and
+    none of them is checked again per call.
+    """
+    steps: list[Callable[[_Image.Image], _Image.Image]] = []
+
+    def convert(im: _Image.Image) -> _Image.Image:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return im.convert(image_mode)
+
+    steps.append(convert)
+
+    if shape is not None:
+        width, height = shape
+
+        # the image is in `image_mode` by now, and "1" and "P" cannot be box-reduced
+        if width and height and image_mode not in ("1", "P"):
+
+            def reduce(im: _Image.Image) -> _Image.Image:
+                factor = int(min(im.width / width, im.height / height) / _REDUCING_GAP)
+                return im.reduce(factor) if factor >= 2 else im
+
+        else:
+
+            def reduce(im: _Image.Image) -> _Image.Image:
+                return im
+
+        def resize(im: _Image.Image) -> _Image.Image:
+            return _resize_and_crop(reduce(im), shape)
+
+        def resize_and_mirror(im: _Image.Image) -> _Image.Image:
+            im = reduce(im)
+            # the center crop is symmetric, so the mirror can run on whichever side
+            # of the resize has fewer pixels
+            if (width or im.width) * (height or im.height) > im.width * im.height:
+                return _resize_and_crop(_mirror(im), shape)
+            return _mirror(_resize_and_crop(im, shape))
+
+        steps.append(resize_and_mirror if mirror else resize)
+    elif mirror:
+        steps.append(_mirror)
+
+    finish = format_image
+    if invert_colors and type == "numpy" and image_mode in ("L", "RGB"):
+
+        def finish(im: _Image.Image) -> np.ndarray | _Image.Image | str | None:
+            # np.invert is SIMD-vectorized on contiguous uint8 data and writes the
+            # returned array, so the pixels leave PIL only once
+            return np.invert(np.asarray(im))
+
+    elif invert_colors:
+        steps.append(_invert)
+
+    def process_image(im: _Image.Image) -> np.ndarray | _Image.Image | str | None:
+        for step in steps:
+            im = step(im)
+        return finish(im)
+
+    if _passes_through(shape, invert_colors, mirror, type):
+
+        def process_or_pass_through(
+            im: _Image.Image,
+        ) -> np.ndarray | _Image.Image | str | None:
+            if im.mode == image_mode and getattr(im, "filename", None):
+                # the cached upload already is the requested image, so skip the decode;
+                # pixels are never read, though a base64 payload is still hashed once
+                im.close()
+                return im.filename
+            return process_image(im)
+
+        return process_or_pass_through
+    return process_image
+
+
+PayloadKind = Literal["b64", "path"]
+
+
+def _resolve_cached(payload: str, cache_dir: str) -> str | None:
+    """
+    Returns the resolved path of `payload` if it is a file path inside `cache_dir`,
+    else None. Both sides are resolved first so that `..` components and symlinks
+    cannot lead out of the cache.
+    """
+    if not os.path.isabs(payload):
+        return None
+    # raw base64 can start with "/" too; the string-only check turns it away before
+    # realpath stats every component of it
+    cache_dir = os.path.normpath(os.path.abspath(cache_dir))
+    if os.path.commonpath([os.path.normpath(payload), cache_dir]) != cache_dir:
+        return None
+    path = os.path.realpath(payload)
+    cache_dir = os.path.realpath(cache_dir)
+    if os.path.commonpath([path, cache_dir]) != cache_dir:
+        return None
+    return path
+
+
+def _cached_path(payload: str, cache_dir: str) -> str:
+    path = _resolve_cached(payload, cache_dir)
+    if path is None:
+        raise ValueError(f"Cannot open {payload}: only files in the cache can be used.")
+    return path
+
+
+def _decode_base64(payload: str, cache_dir: str) -> BytesIO:
+    return BytesIO(base64.b64decode(_extract_base64_data(payload)))
+
+
+# maps a payload kind to a function returning something `Image.open` accepts: base64
+# is decoded in memory, paths must point into the cache
+_PAYLOAD_LOADERS: dict[str, Callable[[str, str], Union[str, BytesIO]]] = {
+    "b64": _decode_base64,
+    "path": _cached_path,
+}
+
+
+def _payload_kind(payload: str, cache_dir: str) -> PayloadKind:
+    if _resolve_cached(payload, cache_dir) is not None:
+        return "path"
+    return "b64"
+
+
 class ImageData(GradioModel):
+    """
+    `back` and `mask` are either base64 data URLs (as sent by the browser canvas) or
+    paths to files already streamed into the cache through Gradio's `/upload` route.
+    `back_kind` and `mask_kind` say which one; they are inferred when not given.
+    """
     back: Optional[str] = None
     mask: Optional[str] = None
+    back_kind: Optional[PayloadKind] = None
+    mask_kind: Optional[PayloadKind] = None
 
 @document()
 class LegacyImage(StreamingInput, Component):
@@ -87,6 +432,7 @@ class LegacyImage(StreamingInput, Component):
         brush_radius: float | None = None,
         brush_color: str = "#000000",
         mask_opacity: float = 0.7,
+        format: Literal["png", "jpeg"] = "png",
     ):
         """
         Parameters:
@@ -110,6 +456,7 @@ class LegacyImage(StreamingInput, Component):
             render: If False, component will not render be rendered in the Blocks context. Should be used if the intention is to assign event listeners now but render the component later.
             mirror_webcam: If True webcam will be mirrored. Default is True.
             show_share_button: If True, will show a share icon in the corner of the component that allows user to share outputs to Hugging Face Spaces Discussions. If False, icon does not appear. If set to None (default behavior), then the icon appears if this Gradio app is launched on Spaces, but not otherwise.
+            format: Format used to send output images to the browser. "jpeg" is lossy but much faster to encode and smaller; it only applies to uint8 grayscale or RGB images, anything else is sent as "png".
         """
         self.mirror_webcam = mirror_webcam
         valid_types = ["numpy", "pil", "filepath"]
@@ -144,11 +491,43 @@ class LegacyImage(StreamingInput, Component):
             self.tool = "sketch" if source == "canvas" else "editor"
         else:
             self.tool = tool
+        self._needs_mask = self.tool == "sketch" and self.source in {"upload", "webcam"}
         self.invert_colors = invert_colors
         self.shape = shape
         self.brush_radius = brush_radius
         self.brush_color = brush_color
         self.mask_opacity = mask_opacity
+        valid_formats = ["png", "jpeg"]
+        if format not in valid_formats:
+            raise ValueError(
+                f"Invalid value for parameter `format`: {format}. Please choose from one of: {valid_formats}"
+            )
+        self.format = format
+        # JPEGs are decoded no smaller than the resize needs to keep its quality
+        self._draft_size = (
+            (int(shape[0] * _REDUCING_GAP), int(shape[1] * _REDUCING_GAP))
+            if shape is not None and shape[0] and shape[1]
+            else None
+        )
+        mirror = (
+            self.source == "webcam"
+            and self.mirror_webcam is True
+            and self.tool != "color-sketch"
+        )
+        self._process_image = _compile_process_image(
+            self.image_mode,
+            self.shape,
+            self.invert_colors,
+            mirror,
+            self.type,
+            self.format_image,
+        )
+        # a pass-through hands out a cached file, so only then is base64 written to disk
+        self._payload_loaders = (
+            {**_PAYLOAD_LOADERS, "b64": _save_base64_to_cache}
+            if _passes_through(self.shape, self.invert_colors, mirror, self.type)
+            else _PAYLOAD_LOADERS
+        )
 
         super().__init__(
             label=label,
@@ -170,64 +549,73 @@ class LegacyImage(StreamingInput, Component):
             im, cast(Literal["numpy", "pil", "filepath"], self.type), self.GRADIO_CACHE
         )
 
+    def open_image(
+        self,
+        payload: str,
+        kind: PayloadKind | None = None,
+        draft_size: tuple[int, int] | None = None,
+    ) -> _Image.Image:
+        """
+        Lazily opens an uploaded image, either decoded in memory from base64 or from a
+        file in the cache. Pixel data is not read until the image is first converted or
+        loaded. If `draft_size` is given, JPEGs are decoded at the smallest DCT scale
+        that is still at least that large.
+        """
+        if kind is None:
+            kind = _payload_kind(payload, self.GRADIO_CACHE)
+        im = _open(self._payload_loaders[kind](payload, self.GRADIO_CACHE))
+        # PngImageFile.getexif() loads the whole image, so PNGs are only checked when
+        # an eXIf chunk was seen in the header; other formats parse it from the header
+        if im.format != "PNG" or "exif" in im.info:
+            orientation = im.getexif().get(_EXIF_ORIENTATION, 1)
+        else:
+            orientation = 1
+        if draft_size is not None and im.format == "JPEG":
+            if orientation in (5, 6, 7, 8):  # rotated by 90 degrees once transposed
+                draft_size = (draft_size[1], draft_size[0])
+            im.draft(self.image_mode, draft_size)
+        if orientation != 1:
+            im = _exif_transpose(im)
+        return im
+
     def preprocess(self, x: ImageData) -> PreprocessData | None:
         if x is None:
             return x
 
-        mask_im = None
-        if self.tool == "sketch" and self.source in ["upload", "webcam"]:
-            mask_im = processing_utils.decode_base64_to_image(x.mask) if x.mask is not None else None
-        im = processing_utils.decode_base64_to_image(x.back)
-
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            im = im.convert(self.image_mode)
-        if self.shape is not None:
-            im = processing_utils.resize_and_crop(im, self.shape)
-        if self.invert_colors:
-            im = PIL.ImageOps.invert(im)
-        if (
-            self.source == "webcam"
-            and self.mirror_webcam is True
-            and self.tool != "color-sketch"
-        ):
-            im = PIL.ImageOps.mirror(im)
-
-        if self.tool == "sketch" and self.source in ["upload", "webcam"]:
+        mask = None
+        if self._needs_mask and x.mask is not None:
+            mask_im = self.open_image(x.mask, x.mask_kind)
             if mask_im.mode == "RGBA":  # whiten any opaque pixels in the mask
-                alpha_data = mask_im.getchannel("A").convert("L")
-                mask_im = _Image.merge("RGB", [alpha_data, alpha_data, alpha_data])
-            return {
-                "back": self.format_image(im),
-                "mask": self.format_image(mask_im)
-            }
+                alpha = np.asarray(mask_im.getchannel("A"))
+                rgb = np.broadcast_to(alpha[..., None], alpha.shape + (3,))
+                mask_im = _fromarray(np.ascontiguousarray(rgb))
+            else:  # read it now so a "pil" mask does not keep the upload open
+                mask_im.load()
+            mask = self.format_image(mask_im)
 
         return {
-            "back": self.format_image(im),
-            "mask": None
+            "back": self._process_image(
+                self.open_image(x.back, x.back_kind, self._draft_size)
+            ),
+            "mask": mask,
         }
 
     def postprocess(self, y: PreprocessData | None) -> ImageData | None:
         if y is None:
             return None
 
-        if isinstance(y["back"], np.ndarray):
-            return ImageData(
-                back=processing_utils.encode_array_to_base64(y["back"]),
-                mask=None,
-            )
-        elif isinstance(y["back"], _Image.Image):
-            return ImageData(
-                back=processing_utils.encode_pil_to_base64(y["back"]),
-                mask=None,
-            )
-        elif isinstance(y["back"], (str, Path)):
-            return ImageData(
-                back=client_utils.encode_url_or_file_to_base64(y["back"]),
-                mask=None,
-            )
-        else:
-            raise ValueError("Cannot process this value as an Image")
+        back = y["back"]
+        encode = _ENCODERS.get(type(back)) or _find_encoder(type(back))
+        return ImageData(back=encode(back, self.format), mask=None, back_kind="b64")
+
+    def postprocess_batch(
+        self, ys: list[PreprocessData | None]
+    ) -> list[ImageData | None]:
+        """
+        Postprocesses several values at once, encoding them in parallel on a shared
+        thread pool. The results are in the same order as `ys`.
+        """
+        return list(_encode_pool.map(self.postprocess, ys))
 
     def check_streamable(self):
         if self.streaming and self.sources != ["webcam"]:
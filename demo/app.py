@@ -4,11 +4,7 @@ import gradio as gr
 from gradio_legacyimage import LegacyImage
 
 def process(x):
-    flip = x.copy()
-    flip["back"] = np.fliplr(flip["back"])
-    mask = x.copy()
-    mask["back"] = mask["mask"]
-    return x, flip, mask
+    return x, {**x, "back": np.fliplr(x["back"])}, {**x, "back": x["mask"]}
 
 with gr.Blocks() as demo:
     with gr.Column():
@@ -1,4 +1,8 @@
+export type PayloadKind = "b64" | "path";
+
 export interface ImageData {
 	back: string | null;
 	mask: string | null;
+	back_kind?: PayloadKind | null;
+	mask_kind?: PayloadKind | null;
 }
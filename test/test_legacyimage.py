@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import base64
+import os
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from gradio_legacyimage import LegacyImage
+from gradio_legacyimage.legacyimage import ImageData
+
+
+def decode(data_url: str) -> Image.Image:
+    return Image.open(BytesIO(base64.b64decode(data_url.split(",", 1)[1])))
+
+
+def data_url(im: Image.Image, format: str = "PNG") -> str:
+    buf = BytesIO()
+    im.save(buf, format)
+    return f"data:image/{format.lower()};base64," + base64.b64encode(
+        buf.getvalue()
+    ).decode()
+
+
+def palette_image(color: tuple[int, int, int]) -> Image.Image:
+    im = Image.new("P", (8, 8), 0)
+    im.putpalette(list(color) * 256)
+    return im
+
+
+class TestPostprocessCache:
+    def test_palette_images_with_same_indices_are_not_shared(self):
+        component = LegacyImage()
+        red = component.postprocess({"back": palette_image((255, 0, 0)), "mask": None})
+        blue = component.postprocess({"back": palette_image((0, 0, 255)), "mask": None})
+        assert red.back != blue.back
+        assert decode(red.back).convert("RGB").getpixel((0, 0)) == (255, 0, 0)
+        assert decode(blue.back).convert("RGB").getpixel((0, 0)) == (0, 0, 255)
+
+    def test_images_differing_in_transparency_are_not_shared(self):
+        component = LegacyImage()
+        plain = Image.new("RGB", (8, 8), (10, 20, 30))
+        transparent = plain.copy()
+        transparent.info["transparency"] = (10, 20, 30)
+        first = component.postprocess({"back": plain, "mask": None})
+        second = component.postprocess({"back": transparent, "mask": None})
+        assert first.back != second.back
+        assert "transparency" not in decode(first.back).info
+        assert decode(second.back).info["transparency"] == (10, 20, 30)
+
+
+class TestPreprocess:
+    def test_sketch_without_mask(self):
+        component = LegacyImage(tool="sketch")
+        x = ImageData(back=data_url(Image.new("RGB", (8, 6), (1, 2, 3))))
+        out = component.preprocess(x)
+        assert out["mask"] is None
+        assert out["back"].shape == (6, 8, 3)
+
+    def test_filepath_passes_the_cached_upload_through(self):
+        component = LegacyImage(type="filepath")
+        x = ImageData(back=data_url(Image.new("RGB", (8, 6), (1, 2, 3))))
+        path = component.preprocess(x)["back"]
+        assert os.path.dirname(os.path.dirname(path)) == component.GRADIO_CACHE
+        with Image.open(path) as im:
+            assert im.getpixel((0, 0)) == (1, 2, 3)
+
+
+class TestPostprocess:
+    def test_jpeg_format(self):
+        arr = np.full((6, 8, 3), 128, dtype=np.uint8)
+        out = LegacyImage(format="jpeg").postprocess({"back": arr, "mask": None})
+        assert out.back.startswith("data:image/jpeg;base64,")
+        assert decode(out.back).size == (8, 6)
+
+    def test_jpeg_format_falls_back_to_png_for_alpha(self):
+        arr = np.full((6, 8, 4), 128, dtype=np.uint8)
+        out = LegacyImage(format="jpeg").postprocess({"back": arr, "mask": None})
+        assert out.back.startswith("data:image/png;base64,")
+
+    def test_batch_keeps_order(self):
+        component = LegacyImage()
+        values = [
+            {"back": np.full((4, 4, 3), i * 10, dtype=np.uint8), "mask": None}
+            for i in range(10)
+        ] + [None]
+        out = component.postprocess_batch(values)
+        assert out[-1] is None
+        for i, data in enumerate(out[:-1]):
+            assert decode(data.back).getpixel((0, 0)) == (i * 10,) * 3
+
+
+class TestPathPayloads:
+    def test_paths_outside_the_cache_are_rejected(self, tmp_path):
+        component = LegacyImage()
+        path = tmp_path / "image.png"
+        Image.new("RGB", (8, 8)).save(path)
+        with pytest.raises(ValueError):
+            component.preprocess(ImageData(back=str(path), back_kind="path"))
+
+    def test_paths_escaping_the_cache_are_rejected(self, tmp_path):
+        component = LegacyImage()
+        secret = tmp_path / "secret.png"
+        Image.new("RGB", (8, 8), (1, 2, 3)).save(secret)
+        cache = os.path.abspath(component.GRADIO_CACHE)
+        up = [".."] * (len(cache.strip(os.sep).split(os.sep)) + 1)
+        payload = os.path.join(cache, "x", *up, str(secret).lstrip(os.sep))
+        with pytest.raises(ValueError):
+            component.preprocess(ImageData(back=payload, back_kind="path"))
+        with pytest.raises((ValueError, OSError)):
+            component.preprocess(ImageData(back=payload))
+
+    def test_pil_mask_from_a_path_is_loaded_and_closed(self):
+        component = LegacyImage(type="pil", tool="sketch")
+        os.makedirs(os.path.join(component.GRADIO_CACHE, "test"), exist_ok=True)
+        path = os.path.join(component.GRADIO_CACHE, "test", "mask.png")
+        Image.new("L", (8, 8), 255).save(path)
+        mask = component.preprocess(ImageData(back=path, mask=path))["mask"]
+        assert mask.im is not None
+        assert mask.fp is None